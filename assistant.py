@@ -1,4 +1,5 @@
 import os
+import time
 import threading
 from dotenv import load_dotenv
 
@@ -23,23 +24,82 @@ def _is_farewell(text: str) -> bool:
     return any(phrase in text for phrase in FAREWELL_PHRASES)
 
 
+class ComponentInitError(RuntimeError):
+    """Raised by _LazyComponent.get() when the component's constructor failed."""
+
+
+class _LazyComponent:
+    """
+    Builds one handler on its own thread as soon as it is created.
+    get() blocks only until that handler is ready, so independent handlers
+    load concurrently and callers wait only on what they actually use.
+    """
+
+    def __init__(self, name: str, factory):
+        self.name     = name
+        self.elapsed  = None
+        self._factory = factory
+        self._value   = None
+        self._error   = None
+        self._ready   = threading.Event()
+        self._thread  = threading.Thread(
+            target=self._build, daemon=True, name=f"Init-{name}"
+        )
+        self._thread.start()
+
+    def _build(self):
+        start = time.perf_counter()
+        try:
+            self._value = self._factory()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.elapsed = time.perf_counter() - start
+            status = "failed" if self._error else "ready"
+            print(f"[Startup] {self.name} {status} in {self.elapsed:.2f}s")
+            self._ready.set()
+
+    def wait(self):
+        """Block until the constructor has returned or raised."""
+        self._ready.wait()
+
+    def get(self):
+        if not self._ready.is_set():
+            print(f"[Startup] Waiting for {self.name}...")
+            self._ready.wait()
+        if self._error is not None:
+            raise ComponentInitError(f"{self.name}: {self._error}") from self._error
+        return self._value
+
+
 def main():
     print("Initializing John AI Assistant...")
+    started = time.perf_counter()
 
     if not os.getenv("GEMINI_API_KEY"):
         print("Error: GEMINI_API_KEY not found. Add it to your .env file.")
         return
 
+    # The handlers are independent — load them together. Standby only needs
+    # the mic and the hotkeys; LLM and TTS are waited on at first use.
+    audio_init = _LazyComponent("Audio", lambda: AudioHandler(wake_word="hey john"))
+    llm_init   = _LazyComponent("LLM",   LLMHandler)
+    tts_init   = _LazyComponent("TTS",   lambda: TTSHandler(voice="af_heart"))
+
+    # Hotkeys are only started inside the main try below, so the terminal
+    # leaves raw mode via hotkey.stop() on every exit path.
     try:
-        audio  = AudioHandler(wake_word="hey john")
-        llm    = LLMHandler()
-        tts    = TTSHandler(voice="af_heart")
         hotkey = HotkeyHandler()
+        audio = audio_init.get()             # capture path must be live to listen
     except Exception as e:
         print(f"Failed to initialize: {e}")
         return
+    except KeyboardInterrupt:
+        print("\nExiting John AI Assistant. Goodbye!")
+        return
 
-    hotkey.start()
+    print(f"[Startup] Capture path live after {time.perf_counter() - started:.2f}s "
+          f"(LLM/TTS continue loading in the background)")
 
     print("\n┌─────────────────────────────────────────────────┐")
     print("│            John AI Assistant Ready             │")
@@ -61,6 +121,14 @@ def main():
 
     threading.Thread(target=wake_word_thread, daemon=True, name="WakeWord").start()
 
+    # ── Report total cold start once the slower components land ──────────────
+    def startup_report():
+        for component in (llm_init, tts_init):
+            component.wait()
+        print(f"[Startup] All components loaded in {time.perf_counter() - started:.2f}s")
+
+    threading.Thread(target=startup_report, daemon=True, name="StartupReport").start()
+
     # ── Hotkey watcher: space pressed → cancel mic instantly → set wake_event ─
     def hotkey_watcher():
         while True:
@@ -76,6 +144,8 @@ def main():
     #  Main loop — two states: STANDBY and SESSION
     # ─────────────────────────────────────────────────────────────────────────
     try:
+        hotkey.start()
+
         while True:
 
             # ══════════════════════════════════════════════════════════════════
@@ -98,6 +168,7 @@ def main():
             #  SESSION  — query mode, ENTER key ends the session
             # ══════════════════════════════════════════════════════════════════
             hotkey.clear_sleep()
+            tts = tts_init.get()             # no-op once loaded
             tts.process_llm_stream(iter(["Yes? How can I help you?"]))
             print("\n[Session — say 'Goodbye John' or press ENTER to end]\n")
 
@@ -127,9 +198,11 @@ def main():
                     print("\n[Session ended — returning to standby]\n")
                     break
 
-                response_stream = llm.generate_response_stream(query)
+                response_stream = llm_init.get().generate_response_stream(query)
                 tts.process_llm_stream(response_stream)
 
+    except ComponentInitError as e:
+        print(f"Failed to initialize: {e}")
     except KeyboardInterrupt:
         print("\nExiting John AI Assistant. Goodbye!")
     finally:
@@ -11,6 +11,22 @@ except Exception:
     pass
 
 
+def transcribe_pcm(pcm: bytes, sample_rate=16000, sample_width=2, recognizer=None) -> str:
+    """
+    Transcribe raw mono PCM (e.g. uploaded by a remote client) with Google STT.
+    Needs no microphone. Returns lowercase text, or "" on silence/failure.
+    """
+    recognizer = recognizer or sr.Recognizer()
+    audio = sr.AudioData(pcm, sample_rate, sample_width)
+    try:
+        return recognizer.recognize_google(audio).lower()
+    except sr.UnknownValueError:
+        return ""
+    except sr.RequestError as e:
+        print(f"[Google STT error]: {e}")
+        return ""
+
+
 class AudioHandler:
     def __init__(self, wake_word="hey john"):
         self.wake_word = wake_word.lower()
@@ -0,0 +1,125 @@
+"""
+bench_server.py
+───────────────
+Concurrent sessions per core for server.py, with the local STT/LLM
+stand-ins so only the shared TTS pool and the server itself are measured.
+
+Each simulated client opens its own session and sends `--utterances`
+uploads of one second of silence back to back, reading the streamed reply.
+A concurrency level is sustained when 95% of replies still arrive faster
+than they would play (speed ≥ 1.0), nothing was refused and every reply
+was complete (the server's truncated/disconnected counters did not move).
+
+Usage:
+  python bench_server.py                          # 1, 2, 4, ... clients
+  python bench_server.py --clients 2 4 8 --workers 4
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+import http.client
+import numpy as np
+
+from server import build_server
+
+_UPLOAD = bytes(16000 * 2)                   # 1 s of 16 kHz int16 silence
+
+
+def _client(port, utterances, out):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("POST", "/sessions")
+    session_id = json.loads(conn.getresponse().read())["session_id"]
+
+    for _ in range(utterances):
+        start = time.perf_counter()
+        conn.request("POST", f"/sessions/{session_id}/utterance", body=_UPLOAD,
+                     headers={"X-Sample-Rate": "16000"})
+        resp = conn.getresponse()
+        if resp.status == 503:
+            resp.read()
+            out.append(None)
+            continue
+
+        first, received = None, 0
+        while True:
+            block = resp.read1(65536)
+            if not block:
+                break
+            if first is None:
+                first = time.perf_counter() - start
+            received += len(block)
+        wall = time.perf_counter() - start
+        audio_seconds = received / 2 / 24000
+        out.append((first, audio_seconds / wall))
+
+    conn.request("DELETE", f"/sessions/{session_id}")
+    conn.getresponse().read()
+    conn.close()
+
+
+def run_level(server, clients, utterances):
+    port = server.server_address[1]
+    before = server.metrics()
+    results = []
+    threads = [threading.Thread(target=_client, args=(port, utterances, results))
+               for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    after = server.metrics()
+
+    served = [r for r in results if r is not None]
+    rejected = len(results) - len(served)
+    firsts = [r[0] for r in served if r[0] is not None]
+    speeds = [r[1] for r in served]
+    return {
+        "first_p50": float(np.percentile(firsts, 50)) if firsts else float("nan"),
+        "first_p95": float(np.percentile(firsts, 95)) if firsts else float("nan"),
+        "speed_p5":  float(np.percentile(speeds, 5)) if speeds else 0.0,
+        "rejected":  rejected,
+        "truncated": sum(after[k] - before[k] for k in ("truncated", "disconnected")),
+        "per_sec":   len(served) / elapsed,
+    }
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, nargs="+",
+                        default=[c for c in (1, 2, 4, 8, 16, 32, 64) if c <= 4 * cores])
+    parser.add_argument("--utterances", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-active", type=int, default=None)
+    args = parser.parse_args()
+
+    server = build_server(port=0, workers=args.workers, max_active=args.max_active, stand_ins=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    sustained = 0
+    print(f"{'clients':>8} {'first p50':>10} {'first p95':>10} {'speed p5':>9} "
+          f"{'rejected':>9} {'truncated':>10} {'utt/s':>7}")
+    try:
+        for clients in args.clients:
+            r = run_level(server, clients, args.utterances)
+            print(f"{clients:>8} {r['first_p50']:>10.3f} {r['first_p95']:>10.3f} "
+                  f"{r['speed_p5']:>9.2f} {r['rejected']:>9} {r['truncated']:>10} {r['per_sec']:>7.2f}")
+            if r["speed_p5"] >= 1.0 and r["rejected"] == 0 and r["truncated"] == 0:
+                sustained = clients
+    finally:
+        print("\nPool metrics:", json.dumps(server.pool.metrics(), indent=2))
+        server.shutdown()
+        server.server_close()
+        server.pool.close()
+
+    print(f"\nSustained {sustained} concurrent sessions on {cores} cores "
+          f"= {sustained / cores:.2f} sessions/core")
+
+
+if __name__ == "__main__":
+    main()
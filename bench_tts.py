@@ -0,0 +1,75 @@
+"""
+bench_tts.py
+────────────
+Real-time factor (RTF = synthesis time / audio duration, lower is better)
+of Kokoro against onnxruntime intra-op thread count, per-sentence vs batched.
+
+Usage:
+  python bench_tts.py                       # threads 1, 2, 4, ... up to cpu_count
+  python bench_tts.py --threads 1 2 4 --repeats 5
+"""
+
+import os
+import time
+import argparse
+import numpy as np
+
+from tts_handler import load_kokoro, _split_at_pauses
+
+SENTENCES = [
+    "Sure, here is what I found.",
+    "It is sunny in Kochi today.",
+    "The high will be thirty one degrees.",
+    "Expect light rain in the evening.",
+    "Anything else I can help you with?",
+]
+
+
+def _rtf(fn, repeats):
+    """Median RTF of fn(), which must return (samples, sample_rate)."""
+    ratios = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        samples, sample_rate = fn()
+        elapsed = time.perf_counter() - start
+        ratios.append(elapsed / (len(samples) / sample_rate))
+    return float(np.median(ratios))
+
+
+def bench(threads, repeats, voice, graph_optimization):
+    kokoro = load_kokoro(intra_op_threads=threads, graph_optimization=graph_optimization)
+    kokoro.create("Hello there.", voice=voice, lang="en-us")   # warmup
+
+    def per_sentence():
+        parts = [kokoro.create(s, voice=voice, lang="en-us") for s in SENTENCES]
+        return np.concatenate([p[0] for p in parts]), parts[0][1]
+
+    def batched():
+        phonemes = [kokoro.tokenizer.phonemize(s, "en-us").strip() for s in SENTENCES]
+        samples, sample_rate = kokoro.create(" ".join(phonemes), voice=voice,
+                                             lang="en-us", is_phonemes=True)
+        _split_at_pauses(samples, [len(p) for p in phonemes], sample_rate)
+        return samples, sample_rate
+
+    return _rtf(per_sentence, repeats), _rtf(batched, repeats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    cores = os.cpu_count() or 1
+    default_threads = sorted({1, *[t for t in (2, 4, 8, 16) if t < cores], cores})
+    parser.add_argument("--threads", type=int, nargs="+", default=default_threads)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--voice", default="af_heart")
+    parser.add_argument("--graph-opt", default="all",
+                        choices=("disable", "basic", "extended", "all"))
+    args = parser.parse_args()
+
+    print(f"{'threads':>8} {'per-sentence RTF':>18} {'batched RTF':>13}")
+    for threads in args.threads:
+        single, batch = bench(threads, args.repeats, args.voice, args.graph_opt)
+        print(f"{threads:>8} {single:>18.3f} {batch:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -153,6 +153,10 @@ class HotkeyHandler:
 
     def stop(self):
         self._stop_event.set()
+        # Wait for the listener's finally to restore the terminal; the loop
+        # polls every 100 ms, and daemon threads are killed at exit without it.
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
 
     def clear_wake(self):
         self.wake_pressed.clear()
@@ -1,10 +1,13 @@
 import os
-from google import genai
-from google.genai import types
 
 class LLMHandler:
-    def __init__(self):
-        self.client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+    def __init__(self, client=None):
+        """Pass `client` to share one genai.Client across several chat sessions."""
+        # Deferred: google.genai pulls in pydantic/httpx and takes ~1s to import
+        from google import genai
+        from google.genai import types
+
+        self.client = client or genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
         self.model_id = "gemini-2.5-flash"
 
         self.system_prompt = (
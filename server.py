@@ -0,0 +1,396 @@
+"""
+server.py
+─────────
+Serves John to several thin clients (kiosks, web pages) over local HTTP
+streaming. Every client gets its own Gemini chat session; all of them share
+one TTSWorkerPool.
+
+API (all PCM is signed 16-bit little-endian mono):
+  POST   /sessions                  → {"session_id": "..."}
+  POST   /sessions/<id>/utterance   body: PCM at X-Sample-Rate (default 16000)
+                                    → chunked audio/L16 at 24 kHz, streamed as
+                                      it is synthesized; the transcript is in
+                                      the X-Transcript header (URL-quoted) and
+                                      the X-Reply-Complete trailer is 0 if the
+                                      reply was cut short
+                                    → 409 while the session is already
+                                      answering, 503 when the server is full
+  DELETE /sessions/<id>             (idle sessions also expire, see --session-ttl)
+  GET    /metrics                   → JSON: sessions, admission, TTS pool
+
+Usage:
+  python server.py --port 8765 --workers 4
+  python server.py --stand-ins      # local STT/LLM stand-ins, no network
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import argparse
+import threading
+from urllib.parse import quote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from tts_pool import TTSWorkerPool
+
+# Match sentence endings: period, exclamation, question mark followed by space
+_SENTENCE_ENDINGS = re.compile(r'(?<=[.!?])\s+')
+
+_SESSION_PATH = re.compile(r"^/sessions/([0-9a-f]{32})(/utterance)?$")
+
+# Sentences of one reply submitted to the pool ahead of the one being sent
+_REPLY_LOOKAHEAD = 2
+
+
+# ─── Local stand-ins for benchmarking without Google STT / Gemini ─────────────
+def stand_in_stt(pcm: bytes, sample_rate=16000, sample_width=2) -> str:
+    seconds = len(pcm) / (sample_rate * sample_width)
+    return f"tell me something about a {seconds:.0f} second question"
+
+
+class StandInLLM:
+    """Streams a fixed multi-sentence reply in small chunks, like Gemini does."""
+
+    REPLY = (
+        "Sure, here is a quick answer. The weather in Kochi is warm and humid today, "
+        "with a chance of light rain later in the evening. "
+        "Is there anything else you would like to know?"
+    )
+
+    def __init__(self, chunk_chars=24, delay=0.02):
+        self.chunk_chars = chunk_chars
+        self.delay = delay
+
+    def generate_response_stream(self, query: str):
+        for i in range(0, len(self.REPLY), self.chunk_chars):
+            time.sleep(self.delay)
+            yield self.REPLY[i:i + self.chunk_chars]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+class _Session:
+    """One client's chat. `busy` lets only one utterance drive the chat at a time."""
+
+    def __init__(self, llm):
+        self.llm       = llm
+        self.busy      = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+class AssistantServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, pool, stt, llm_factory, max_active=None,
+                 voice="af_heart", session_ttl=600):
+        """
+        stt         : fn(pcm, sample_rate) → transcript
+        llm_factory : fn() → object with generate_response_stream(query)
+        max_active  : utterances processed at once; more are refused with 503.
+                      The default keeps every admitted reply's lookahead
+                      within the pool's pending limit.
+        session_ttl : seconds a session may sit idle before it is dropped
+        """
+        super().__init__(address, _Handler)
+        self.pool        = pool
+        self.stt         = stt
+        self.llm_factory = llm_factory
+        self.voice       = voice
+        self.max_active  = max_active or max(1, pool.max_pending // _REPLY_LOOKAHEAD)
+        self.session_ttl = session_ttl
+
+        self.sessions  = {}                  # session_id → _Session
+        self.lock      = threading.Lock()
+        self._active   = threading.BoundedSemaphore(self.max_active)
+        self._counters = dict(sessions_created=0, sessions_expired=0, utterances=0,
+                              rejected=0, conflicts=0, truncated=0, disconnected=0)
+
+        self._stop_reaper = threading.Event()
+        threading.Thread(target=self._reap_sessions, daemon=True, name="SessionReaper").start()
+
+    def server_close(self):
+        self._stop_reaper.set()
+        super().server_close()
+
+    def count(self, name):
+        with self.lock:
+            self._counters[name] += 1
+
+    def create_session(self) -> str:
+        session_id = uuid.uuid4().hex
+        session = _Session(self.llm_factory())
+        with self.lock:
+            self.sessions[session_id] = session
+            self._counters["sessions_created"] += 1
+        return session_id
+
+    def _reap_sessions(self):
+        """Drop sessions idle for longer than session_ttl (clients that never DELETE)."""
+        interval = min(60, self.session_ttl / 4)
+        while not self._stop_reaper.wait(interval):
+            cutoff = time.monotonic() - self.session_ttl
+            with self.lock:
+                for session_id, session in list(self.sessions.items()):
+                    if session.last_used < cutoff and not session.busy.locked():
+                        del self.sessions[session_id]
+                        self._counters["sessions_expired"] += 1
+
+    def admit(self) -> bool:
+        """Take an utterance slot without waiting; False when the server is full."""
+        if self._active.acquire(blocking=False):
+            self.count("utterances")
+            return True
+        self.count("rejected")
+        return False
+
+    def release(self):
+        self._active.release()
+
+    def metrics(self) -> dict:
+        with self.lock:
+            return {
+                "sessions":   len(self.sessions),
+                "max_active": self.max_active,
+                **self._counters,
+                "tts_pool":   self.pool.metrics(),
+            }
+
+    def synthesize_reply(self, llm, query):
+        """
+        Yield int16 PCM blocks for the LLM's reply to `query`. Sentences are
+        submitted to the pool as soon as they are complete, at most
+        _REPLY_LOOKAHEAD ahead of the one being sent, so the pool works ahead
+        without one reply hogging it. Raises RuntimeError if the reply could
+        not be completed. Closing the generator (client gone) stops the LLM
+        stream and cancels sentences not yet sent.
+        """
+        jobs, failure = [], []
+        ready = threading.Condition()
+        state = {"sent": 0, "done": False, "cancel": False}
+
+        def _submit(sentence):
+            with ready:
+                ready.wait_for(lambda: state["cancel"]
+                               or len(jobs) - state["sent"] < _REPLY_LOOKAHEAD)
+                if state["cancel"]:
+                    return False
+            job = self.pool.submit(sentence, voice=self.voice)   # waits for a slot
+            with ready:
+                if state["cancel"]:
+                    job.cancel()
+                    return False
+                jobs.append(job)
+                ready.notify_all()
+            return True
+
+        def produce():
+            stream = llm.generate_response_stream(query)
+            buffer = ""
+            try:
+                for chunk in stream:
+                    buffer += chunk
+                    parts = _SENTENCE_ENDINGS.split(buffer)
+                    for sentence in parts[:-1]:
+                        if sentence.strip() and not _submit(sentence.strip()):
+                            return
+                    buffer = parts[-1]
+                if buffer.strip():
+                    _submit(buffer.strip())
+            except Exception as e:
+                failure.append(e)
+            finally:
+                if hasattr(stream, "close"):
+                    stream.close()
+                with ready:
+                    state["done"] = True
+                    ready.notify_all()
+
+        threading.Thread(target=produce, daemon=True, name="ReplyProducer").start()
+
+        try:
+            while True:
+                with ready:
+                    ready.wait_for(lambda: state["sent"] < len(jobs) or state["done"])
+                    if state["sent"] >= len(jobs):
+                        break
+                    job = jobs[state["sent"]]
+                for block in job:
+                    yield (np.clip(block, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+                with ready:
+                    state["sent"] += 1
+                    ready.notify_all()
+        finally:
+            with ready:
+                state["cancel"] = True
+                pending = jobs[state["sent"]:]
+                ready.notify_all()
+            for job in pending:
+                job.cancel()
+
+        if failure:
+            raise RuntimeError(f"Reply cut short: {failure[0]}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"            # needed for chunked responses
+
+    def log_message(self, format, *args):
+        pass                                 # keep the console for [Server] lines
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_empty(self, status, **headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _read_body(self) -> bytes:
+        """Read the whole request body, so an early error reply cannot leave it
+        on the keep-alive connection to be parsed as the next request."""
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+    # ─────────────────────────────────────────────────────────────────────────
+    def do_GET(self):
+        self._read_body()
+        if self.path == "/metrics":
+            self._send_json(200, self.server.metrics())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_DELETE(self):
+        self._read_body()
+        match = _SESSION_PATH.match(self.path)
+        if not match or match.group(2):
+            return self._send_json(404, {"error": "not found"})
+        with self.server.lock:
+            existed = self.server.sessions.pop(match.group(1), None) is not None
+        self._send_json(200 if existed else 404, {"deleted": existed})
+
+    def do_POST(self):
+        pcm = self._read_body()
+        if self.path == "/sessions":
+            return self._send_json(201, {"session_id": self.server.create_session()})
+
+        match = _SESSION_PATH.match(self.path)
+        if not match or not match.group(2):
+            return self._send_json(404, {"error": "not found"})
+
+        sample_rate = int(self.headers.get("X-Sample-Rate", 16000))
+
+        with self.server.lock:
+            session = self.server.sessions.get(match.group(1))
+        if session is None:
+            return self._send_json(404, {"error": "unknown session"})
+
+        # One utterance per session at a time, or two replies would
+        # interleave in the same chat history
+        if not session.busy.acquire(blocking=False):
+            self.server.count("conflicts")
+            return self._send_json(409, {"error": "session already has an utterance in flight"})
+        try:
+            if not self.server.admit():
+                return self._send_empty(503, Retry_After="1")
+            try:
+                self._reply(session.llm, pcm, sample_rate)
+            finally:
+                self.server.release()
+        finally:
+            session.last_used = time.monotonic()
+            session.busy.release()
+
+    def _reply(self, llm, pcm, sample_rate):
+        query = self.server.stt(pcm, sample_rate)
+
+        self.send_response(200)
+        self.send_header("Content-Type", f"audio/L16; rate={self.server.pool.sample_rate}; channels=1")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Transcript", quote(query))
+        self.send_header("Trailer", "X-Reply-Complete")
+        self.end_headers()
+
+        complete = True
+        if query:
+            reply = self.server.synthesize_reply(llm, query)
+            try:
+                for block in reply:
+                    self._write_chunk(block)
+            except (BrokenPipeError, ConnectionResetError):
+                self.server.count("disconnected")
+                print("[Server] Client went away mid-reply.")
+                return
+            except RuntimeError as e:
+                self.server.count("truncated")
+                print(f"[Server] {e}")
+                complete = False
+            finally:
+                reply.close()                # cancels whatever was not sent
+        self.wfile.write(f"0\r\nX-Reply-Complete: {int(complete)}\r\n\r\n".encode())
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+def build_server(host="127.0.0.1", port=8765, workers=None, max_active=None,
+                 stand_ins=False, voice="af_heart", session_ttl=600):
+    """Start the TTS pool and return an AssistantServer ready to serve_forever()."""
+    pool = TTSWorkerPool(workers=workers, warmup_voice=voice)
+    pool.start()
+
+    if stand_ins:
+        stt, llm_factory = stand_in_stt, StandInLLM
+    else:
+        from google import genai
+        from audio_handler import transcribe_pcm
+        from llm_handler import LLMHandler
+
+        client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+        stt = lambda pcm, sample_rate: transcribe_pcm(pcm, sample_rate)
+        llm_factory = lambda: LLMHandler(client=client)
+
+    return AssistantServer((host, port), pool, stt, llm_factory, max_active=max_active,
+                           voice=voice, session_ttl=session_ttl)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="John AI multi-client server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="TTS worker processes (default: cores)")
+    parser.add_argument("--max-active", type=int, default=None, help="concurrent utterances before 503")
+    parser.add_argument("--session-ttl", type=float, default=600, help="seconds before an idle session expires")
+    parser.add_argument("--stand-ins", action="store_true", help="local STT/LLM stand-ins, no network")
+    args = parser.parse_args()
+
+    if not args.stand_ins and not os.getenv("GEMINI_API_KEY"):
+        print("Error: GEMINI_API_KEY not found. Add it to your .env file or use --stand-ins.")
+        return
+
+    server = build_server(args.host, args.port, args.workers, args.max_active, args.stand_ins,
+                          session_ttl=args.session_ttl)
+    print(f"[Server] Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[Server] Shutting down.")
+    finally:
+        server.server_close()
+        server.pool.close()
+
+
+if __name__ == "__main__":
+    main()
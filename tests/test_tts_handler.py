@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from tts_handler import _MAX_PHONEMES, _split_at_pauses, _split_phoneme_chunks
+
+
+def _normalized(text):
+    return " ".join(text.split())
+
+
+@pytest.mark.parametrize("phonemes", [
+    "ab " * 8 + ", " + "cd " * 150,        # short opening clause, then a long one
+    "ab, " * 3 + "cd " * 150,              # several tiny clauses, then a long one
+    "ab " * 30 + ", " + "cd " * 200,
+    "ab, " * 200,                          # nothing but short clauses
+    "cd " * 400,                           # no punctuation at all
+])
+def test_split_phoneme_chunks_bounds_every_chunk(phonemes):
+    chunks = _split_phoneme_chunks(phonemes, 40, 150)
+
+    assert len(chunks[0]) <= 40
+    assert all(len(c) <= 150 for c in chunks)
+    assert " ".join(chunks) == _normalized(phonemes)
+
+
+def test_split_phoneme_chunks_caps_at_max_phonemes():
+    chunks = _split_phoneme_chunks("cd " * 800, 40, 2000)
+    assert all(len(c) <= _MAX_PHONEMES for c in chunks)
+
+
+def test_split_phoneme_chunks_prefers_clause_punctuation():
+    first = "ab " * 6 + "ab,"
+    chunks = _split_phoneme_chunks(first + " " + "cd " * 40, 40, 150)
+    assert chunks[0] == first
+
+
+def test_split_phoneme_chunks_short_text_is_one_chunk():
+    assert _split_phoneme_chunks("həlˈoʊ.", 40, 150) == ["həlˈoʊ."]
+    assert _split_phoneme_chunks("   ", 40, 150) == []
+
+
+def _tone(seconds, sample_rate):
+    return np.sin(np.arange(int(seconds * sample_rate)) * 0.1).astype(np.float32)
+
+
+def test_split_at_pauses_cuts_in_the_silence():
+    sr = 24000
+    gap = np.zeros(int(0.25 * sr), np.float32)
+    audio = np.concatenate([_tone(1.0, sr), gap, _tone(2.0, sr), gap, _tone(0.7, sr)])
+
+    segments = _split_at_pauses(audio, [10, 22, 7], sr)
+
+    assert len(segments) == 3
+    assert sum(len(s) for s in segments) == len(audio)
+    # Each cut lands inside a gap: the segment's first 10 ms frame is silent
+    for segment in segments[1:]:
+        assert np.abs(segment[:sr // 100]).max() == 0.0
+
+
+def test_split_at_pauses_single_weight_returns_whole():
+    audio = _tone(0.5, 24000)
+    segments = _split_at_pauses(audio, [5], 24000)
+    assert len(segments) == 1 and len(segments[0]) == len(audio)
@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from tts_pool import TTSWorkerPool
+
+
+class FakeProcess:
+    """Stands in for a worker process: a thread speaking the worker's message protocol."""
+
+    def __init__(self, worker_id, tasks, results):
+        self.worker_id = worker_id
+        self.exitcode = None
+        self._tasks = tasks
+        self._results = results
+        self._alive = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        self._results.put(("ready", self.worker_id, None))
+        while self._alive:
+            try:
+                task = self._tasks.get(timeout=0.02)
+            except queue.Empty:
+                continue
+            if task is None:
+                break
+            job_id, text, _, _ = task
+            self._results.put(("start", job_id, time.time()))
+            if text == "hang":                   # crashes mid-job: never reports back
+                continue
+            blocks = 40 if text == "stream" else 1
+            for _ in range(blocks):
+                if not self._alive:
+                    return
+                time.sleep(0.05)
+                self._results.put(("block", job_id, (24000, np.zeros(240, np.float32).tobytes())))
+            self._results.put(("done", job_id, self.worker_id))
+        self._alive = False
+
+    def kill(self):
+        self._alive = False
+        self.exitcode = -9
+
+    def is_alive(self):
+        return self._alive
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def terminate(self):
+        self.kill()
+
+
+class FakePool(TTSWorkerPool):
+    def __init__(self, voices_path, voices_cache, **kwargs):
+        super().__init__(voices_path=str(voices_path), voices_cache=str(voices_cache), **kwargs)
+        self._results = queue.Queue()
+        self.spawned = []
+
+    def _spawn(self, worker_id):
+        tasks = queue.Queue()
+        p = FakeProcess(worker_id, tasks, self._results)
+        self.spawned.append(p)
+        return p, tasks
+
+
+@pytest.fixture
+def make_pool(tmp_path):
+    voices = tmp_path / "voices.bin"
+    with open(voices, "wb") as f:
+        np.savez(f, af_heart=np.zeros((4, 1, 8), np.float32))
+    pools = []
+
+    def make(**kwargs):
+        pool = FakePool(voices, tmp_path / "mmap", **kwargs)
+        pool.start()
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_jobs_complete(make_pool):
+    pool = make_pool(workers=2)
+    blocks = list(pool.submit("hello"))
+    assert len(blocks) == 1 and blocks[0].dtype == np.float32
+    assert pool.metrics()["completed"] == 1
+
+
+def test_dead_worker_detected_while_others_stream(make_pool):
+    pool = make_pool(workers=2, block_timeout=10)
+    hang = pool.submit("hang")
+    busy = pool.submit("stream")                 # keeps results arriving every 50 ms
+    worker_of = {job_id: w for w, job_id in pool._running.items()}
+    pool._processes[worker_of[hang.job_id]].kill()
+
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match="died"):
+        list(hang)
+    assert time.monotonic() - start < 2.0        # not the 10 s block_timeout
+
+    m = pool.metrics()
+    assert m["worker_deaths"] == 1 and m["worker_restarts"] == 1
+    assert hang.job_id not in pool._jobs
+    assert _wait_for(lambda: pool.metrics()["live_workers"] == 2)
+    assert len(list(pool.submit("hello"))) == 1
+    busy.cancel()
+
+
+def test_pool_shrinks_once_restarts_are_used_up(make_pool):
+    pool = make_pool(workers=2, max_pending=8, max_restarts=0)
+    pool._processes[0].kill()
+
+    assert _wait_for(lambda: pool.metrics()["worker_deaths"] == 1)
+    m = pool.metrics()
+    assert m["live_workers"] == 1 and m["restarts_left"] == 0
+    assert m["max_pending"] == 4
+    assert len(list(pool.submit("hello"))) == 1
@@ -1,32 +1,138 @@
 import os
+import time
 import threading
 import queue
 import re
 import numpy as np
-import sounddevice as sd
-from kokoro_onnx import Kokoro as KokoroTTS
 
 # Resolve paths relative to this file so the script works from any cwd
 _HERE = os.path.dirname(os.path.abspath(__file__))
 
+MODEL_PATH  = os.path.join(_HERE, "ai", "models", "kokoro-v1.0.int8.onnx")
+VOICES_PATH = os.path.join(_HERE, "ai", "models", "voices", "voices-v1.0.bin")
+
+# Kokoro runs at most this many phonemes through the model in one pass
+_MAX_PHONEMES = 510
+
+# Sentences at or under this length may share one create() call
+_BATCH_MAX_CHARS = 80
+
+# Streaming: longer sentences are synthesized in phoneme chunks. The first
+# chunk is kept short so audio starts quickly; later chunks are larger since
+# they only have to stay ahead of playback.
+_STREAM_FIRST_PHONEMES = 40
+_STREAM_CHUNK_PHONEMES = 150
+_CLAUSE_PAUSE = 0.1       # seconds of silence after a comma/semicolon chunk
+_FADE_SECONDS = 0.004     # fade at chunk edges to avoid clicks on the joins
+
+# Playback queue bound — blocks (chunks or sentences) synthesized ahead of the speaker
+_QUEUE_BLOCKS = 8
+
+_EXECUTION_MODES = ("sequential", "parallel")
+_GRAPH_OPT_LEVELS = ("disable", "basic", "extended", "all")
+
+
+def _env_int(name: str):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def load_kokoro(model_path=MODEL_PATH, voices_path=VOICES_PATH,
+                intra_op_threads=None, inter_op_threads=None,
+                execution_mode="sequential", graph_optimization="all"):
+    """
+    Build a Kokoro instance on an onnxruntime session with explicit options.
+
+    intra_op_threads / inter_op_threads : None keeps onnxruntime's default
+                                          (one thread per physical core)
+    execution_mode                      : "sequential" or "parallel"
+                                          (inter-op threads only matter for "parallel")
+    graph_optimization                  : "disable", "basic", "extended" or "all"
+    """
+    # Deferred: kokoro_onnx imports onnxruntime and the espeak phonemizer
+    import onnxruntime as ort
+    from kokoro_onnx import Kokoro as KokoroTTS
+
+    if execution_mode not in _EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode: '{execution_mode}'. Use: {', '.join(_EXECUTION_MODES)}.")
+    if graph_optimization not in _GRAPH_OPT_LEVELS:
+        raise ValueError(f"Unknown graph optimization: '{graph_optimization}'. Use: {', '.join(_GRAPH_OPT_LEVELS)}.")
+
+    options = ort.SessionOptions()
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = {
+        "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+        "parallel":   ort.ExecutionMode.ORT_PARALLEL,
+    }[execution_mode]
+    options.graph_optimization_level = {
+        "disable":  ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic":    ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all":      ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }[graph_optimization]
+
+    # Same provider override kokoro_onnx itself honours
+    providers = [os.getenv("ONNX_PROVIDER", "CPUExecutionProvider")]
+    session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+    return KokoroTTS.from_session(session, voices_path)
+
+
 class TTSHandler:
-    def __init__(self, voice="af_heart", speed=1.0, sample_rate=24000):
+    """
+    Inference settings default to the TTS_* variables in .env:
+      TTS_INTRA_OP_THREADS, TTS_INTER_OP_THREADS  (integers)
+      TTS_EXECUTION_MODE  = sequential | parallel
+      TTS_GRAPH_OPT       = disable | basic | extended | all
+      TTS_STREAM          = 1 | 0   (sub-sentence streaming, on by default)
+    """
+
+    def __init__(self, voice="af_heart", speed=1.0, sample_rate=24000,
+                 intra_op_threads=None, inter_op_threads=None,
+                 execution_mode=None, graph_optimization=None,
+                 warmup=True, batch_sentences=True, stream=None):
         self.voice = voice
         self.speed = speed
         self.sample_rate = sample_rate
+        self.batch_sentences = batch_sentences
+        self.stream = stream if stream is not None else os.getenv("TTS_STREAM", "1") != "0"
 
-        # Queue holds numpy audio arrays to be played
-        self.audio_queue = queue.Queue()
+        # Queue holds numpy audio arrays to be played. Bounded, so synthesis
+        # blocks rather than buffering a whole long answer in memory.
+        self.audio_queue = queue.Queue(maxsize=_QUEUE_BLOCKS)
+        self._first_block_latencies = []
         self.is_playing = False
         self.play_thread = None
 
-        model_path  = os.path.join(_HERE, "ai", "models", "kokoro-v1.0.int8.onnx")
-        voices_path = os.path.join(_HERE, "ai", "models", "voices", "voices-v1.0.bin")
+        # Imported here rather than at module level so the server, which only
+        # uses this module's synthesis functions, does not need PortAudio.
+        # Failing here is loud; failing in the playback thread would hang.
+        import sounddevice as sd
+        self._sd = sd
 
         print(f"Loading Kokoro TTS model...")
-        self.tts = KokoroTTS(model_path, voices_path)
+        self.tts = load_kokoro(
+            intra_op_threads=intra_op_threads or _env_int("TTS_INTRA_OP_THREADS"),
+            inter_op_threads=inter_op_threads or _env_int("TTS_INTER_OP_THREADS"),
+            execution_mode=execution_mode or os.getenv("TTS_EXECUTION_MODE", "sequential"),
+            graph_optimization=graph_optimization or os.getenv("TTS_GRAPH_OPT", "all"),
+        )
         print("Kokoro TTS model loaded.")
 
+        if warmup:
+            self.warmup()
+
+    def warmup(self):
+        """
+        Run one throwaway inference so onnxruntime finishes graph
+        initialization and buffer allocation before the first real sentence.
+        """
+        start = time.perf_counter()
+        self.tts.create("Hello there.", voice=self.voice, speed=self.speed, lang="en-us")
+        print(f"[TTS] Warmup inference took {time.perf_counter() - start:.2f}s")
+
     def process_llm_stream(self, response_stream):
         """
         Takes the streaming generator from the LLM, accumulates text into sentences,
@@ -36,6 +142,10 @@ class TTSHandler:
         self.play_thread = threading.Thread(target=self._play_audio_queue, daemon=True)
         self.play_thread.start()
 
+        # Seconds from each sentence being split out of the stream to its
+        # first block reaching the playback queue, in sentence order
+        self._first_block_latencies = []
+
         buffer = ""
         # Match sentence endings: period, exclamation, question mark followed by space or end
         sentence_endings = re.compile(r'(?<=[.!?])\s+')
@@ -48,19 +158,21 @@ class TTSHandler:
 
             # If we have more than one part, the first n-1 are complete sentences
             if len(parts) > 1:
-                for sentence in parts[:-1]:
-                    sentence = sentence.strip()
-                    if sentence:
-                        self._generate_and_queue_audio(sentence)
+                available = time.perf_counter()
+                self._queue_sentences([p.strip() for p in parts[:-1] if p.strip()], available)
                 # Keep the incomplete tail in the buffer
                 buffer = parts[-1]
 
         # Flush any remaining text
         buffer = buffer.strip()
         if buffer:
-            self._generate_and_queue_audio(buffer)
+            self._generate_and_queue_audio(buffer, time.perf_counter())
 
         print()  # Newline after full response is printed
+        if self._first_block_latencies:
+            mode = "stream" if self.stream else "whole-sentence"
+            print(f"[TTS] First-block latency per sentence ({mode}): "
+                  + ", ".join(f"{t:.2f}s" for t in self._first_block_latencies))
 
         # Sentinel to signal playback thread to stop
         self.audio_queue.put(None)
@@ -70,11 +182,26 @@ class TTSHandler:
 
         self.is_playing = False
 
-    def _generate_and_queue_audio(self, text):
+    def _queue_block(self, audio, available=None):
+        """
+        Put one audio block on the playback queue. Pass `available` (the
+        perf_counter() time the sentence was split out of the LLM stream)
+        with a sentence's first block to record its first-block latency.
+        """
+        if available is not None:
+            self._first_block_latencies.append(time.perf_counter() - available)
+        self.audio_queue.put(audio)
+
+    def _generate_and_queue_audio(self, text, available=None):
         """
         Generates audio for a sentence using Kokoro and puts the
         numpy audio array into the playback queue.
+        Long sentences are streamed in chunks when streaming is enabled.
         """
+        if self.stream and len(text) > _BATCH_MAX_CHARS:
+            self._stream_and_queue_audio(text, available)
+            return
+
         try:
             # v1.0 API: create() returns (samples, sample_rate) directly
             samples, sample_rate = self.tts.create(
@@ -86,24 +213,234 @@ class TTSHandler:
             if samples is not None and len(samples) > 0:
                 audio = np.array(samples, dtype=np.float32).flatten()
                 self.sample_rate = sample_rate  # Use model's actual sample rate
-                self.audio_queue.put(audio)
+                self._queue_block(audio, available)
         except Exception as e:
             print(f"\n[TTS Error] Failed to generate audio for: '{text}'\n  Reason: {e}")
 
+    def _stream_and_queue_audio(self, text, available=None):
+        """
+        Phonemize the sentence, synthesize it chunk by chunk and queue each
+        block as soon as it exists, so playback starts after the first chunk
+        instead of the whole sentence.
+        """
+        try:
+            for i, (audio, sample_rate) in enumerate(synthesize_chunks(self.tts, text, self.voice, self.speed)):
+                self.sample_rate = sample_rate
+                self._queue_block(audio, available if i == 0 else None)
+        except Exception as e:
+            print(f"\n[TTS Error] Failed to stream audio for: '{text}'\n  Reason: {e}")
+
+    def _queue_sentences(self, sentences, available=None):
+        """
+        Queue audio for sentences that became available together. Runs of
+        short sentences go through one batched create() call; long ones are
+        synthesized on their own.
+        """
+        if not self.batch_sentences:
+            for sentence in sentences:
+                self._generate_and_queue_audio(sentence, available)
+            return
+
+        # A run is cut whenever its joined phonemes would no longer fit one pass
+        run, run_phonemes = [], []
+        for sentence in sentences:
+            phonemes = self._batch_phonemes(sentence)
+            if run and (phonemes is None or
+                        len(" ".join(run_phonemes + [phonemes])) > _MAX_PHONEMES):
+                self._flush_run(run, run_phonemes, available)
+                run, run_phonemes = [], []
+            if phonemes is None:
+                self._generate_and_queue_audio(sentence, available)
+            else:
+                run.append(sentence)
+                run_phonemes.append(phonemes)
+        if run:
+            self._flush_run(run, run_phonemes, available)
+
+    def _batch_phonemes(self, sentence):
+        """Phonemes for a sentence that may join a batch, or None if it should go alone."""
+        if len(sentence) > _BATCH_MAX_CHARS:
+            return None
+        try:
+            phonemes = self.tts.tokenizer.phonemize(sentence, "en-us").strip()
+        except Exception:
+            return None     # _generate_and_queue_audio reports the failure
+        return phonemes if 0 < len(phonemes) <= _MAX_PHONEMES else None
+
+    def _flush_run(self, sentences, phonemes, available=None):
+        if len(sentences) > 1:
+            self._generate_and_queue_batch(sentences, phonemes, available)
+        else:
+            self._generate_and_queue_audio(sentences[0], available)
+
+    def _generate_and_queue_batch(self, sentences, phonemes, available=None):
+        """Synthesize several sentences in one call and queue one segment per sentence."""
+        try:
+            segments, sample_rate = self.synthesize_batch(phonemes)
+        except Exception as e:
+            print(f"\n[TTS Error] Batched synthesis failed, falling back per sentence.\n  Reason: {e}")
+            for sentence in sentences:
+                self._generate_and_queue_audio(sentence, available)
+            return
+
+        self.sample_rate = sample_rate
+        for audio in segments:
+            if len(audio) > 0:
+                self._queue_block(audio, available)
+
+    def synthesize_batch(self, phonemes):
+        """
+        Run several short sentences, given as phoneme strings whose joined
+        length fits _MAX_PHONEMES, through Kokoro as one sequence and split
+        the waveform back into one float32 array per sentence.
+        Returns (segments, sample_rate).
+
+        Kokoro has no per-phoneme timing in its v1.0 output, so each cut is
+        placed at the quietest 10 ms frame near where the sentence's share of
+        the phonemes says it should end — that lands in the pause the model
+        leaves after sentence-final punctuation.
+        """
+        joined = " ".join(phonemes)
+        if len(joined) > _MAX_PHONEMES:
+            raise ValueError(f"{len(joined)} phonemes exceeds the {_MAX_PHONEMES} limit of one pass")
+
+        samples, sample_rate = self.tts.create(
+            joined, voice=self.voice, speed=self.speed, lang="en-us", is_phonemes=True
+        )
+        audio = np.array(samples, dtype=np.float32).flatten()
+        return _split_at_pauses(audio, [len(p) for p in phonemes], sample_rate), sample_rate
+
     def _play_audio_queue(self):
-        """Background thread that continuously plays audio arrays from the queue."""
+        """
+        Background thread that continuously plays audio arrays from the queue.
+        One output stream stays open for the whole response, so consecutive
+        blocks are written back to back with no device restart between them.
+        """
+        sd = self._sd
+        out = None
+        try:
+            while True:
+                audio_array = self.audio_queue.get()
+
+                # None acts as a sentinel value to signal the end of the stream
+                if audio_array is None:
+                    self.audio_queue.task_done()
+                    break
+
+                try:
+                    if out is None:
+                        out = sd.OutputStream(samplerate=self.sample_rate, channels=1, dtype="float32")
+                        out.start()
+                    out.write(audio_array)
+                except Exception as e:
+                    print(f"Error playing audio: {e}")
+                finally:
+                    self.audio_queue.task_done()
+        finally:
+            if out is not None:
+                out.stop()    # returns once the buffered audio has played
+                out.close()
+
+def _split_at_pauses(audio, weights, sample_rate, search=0.25):
+    """
+    Cut audio into len(weights) segments. Each cut starts at the boundary
+    proportional to the cumulative weights and moves to the lowest-energy
+    10 ms frame within ±search × the expected length of the segment the
+    cut ends.
+    """
+    frame = max(1, sample_rate // 100)
+    n_frames = len(audio) // frame
+    if len(weights) < 2 or n_frames < len(weights):
+        return [audio]
+
+    energy = np.square(audio[:n_frames * frame]).reshape(n_frames, frame).mean(axis=1)
+    total = float(sum(weights))
+    bounds = np.cumsum(weights)[:-1] / total * n_frames
+
+    cuts, prev = [0], 0
+    for i, estimate in enumerate(bounds):
+        span = weights[i] / total * n_frames * search
+        lo = max(prev + 1, int(estimate - span))
+        hi = min(n_frames - 1, int(estimate + span) + 1)
+        if lo >= hi:
+            cut = min(max(prev + 1, int(estimate)), n_frames - 1)
+        else:
+            cut = lo + int(np.argmin(energy[lo:hi]))
+        cuts.append(cut)
+        prev = cut
+
+    edges = [c * frame for c in cuts] + [len(audio)]
+    return [audio[a:b] for a, b in zip(edges[:-1], edges[1:])]
+
+
+def synthesize_chunks(kokoro, text, voice, speed=1.0):
+    """
+    Phonemize `text` and synthesize it chunk by chunk with `kokoro`,
+    yielding (float32 samples, sample_rate) blocks ready to play back to back.
+    """
+    phonemes = kokoro.tokenizer.phonemize(text, "en-us")
+    chunks = _split_phoneme_chunks(phonemes, _STREAM_FIRST_PHONEMES, _STREAM_CHUNK_PHONEMES)
+    for i, chunk in enumerate(chunks):
+        samples, sample_rate = kokoro.create(
+            chunk, voice=voice, speed=speed, lang="en-us", is_phonemes=True
+        )
+        audio = _fade_edges(np.array(samples, dtype=np.float32).flatten(), sample_rate)
+        # Kokoro trims each chunk, so put back the pause its punctuation asks for
+        if i < len(chunks) - 1 and chunk[-1] in ",;:":
+            audio = np.concatenate([audio, np.zeros(int(_CLAUSE_PAUSE * sample_rate), np.float32)])
+        yield audio, sample_rate
+
+
+def _split_phoneme_chunks(phonemes, first, size):
+    """
+    Split a phoneme string into chunks for streaming. The opening chunk is
+    at most `first` phonemes so audio starts quickly; later chunks are at
+    most `size` (and never over _MAX_PHONEMES). Cuts go at clause
+    punctuation when the chunk so far is at least half its limit, otherwise
+    at the last word boundary that fits.
+    """
+    phonemes = " ".join(phonemes.split())
+    pieces = [p for p in re.split(r'(?<=[,;:.!?])\s+', phonemes) if p]
+
+    chunks, current = [], ""
+    for piece in pieces:
+        current = f"{current} {piece}" if current else piece
         while True:
-            audio_array = self.audio_queue.get()
-            
-            # None acts as a sentinel value to signal the end of the stream
-            if audio_array is None:
-                self.audio_queue.task_done()
+            limit = first if not chunks else min(size, _MAX_PHONEMES)
+            if len(current) <= limit:
                 break
-                
-            try:
-                sd.play(audio_array, samplerate=self.sample_rate)
-                sd.wait()
-            except Exception as e:
-                print(f"Error playing audio: {e}")
-            finally:
-                self.audio_queue.task_done()
\ No newline at end of file
+            tail = len(piece) + 1
+            if len(current) > tail and len(current) - tail >= limit // 2:
+                # What came before this piece ends at punctuation and is long enough
+                head, current = current[:-tail], piece
+            else:
+                head, current = _cut_at_word(current, limit)
+            chunks.append(head)
+            piece = current
+
+    if current:
+        limit = min(size, _MAX_PHONEMES)
+        if len(chunks) > 1 and len(current) < first and len(chunks[-1]) + 1 + len(current) <= limit:
+            chunks[-1] = f"{chunks[-1]} {current}"
+        else:
+            chunks.append(current)
+    return chunks
+
+
+def _cut_at_word(text, limit):
+    """Split text at the last space within `limit` characters (hard cut if there is none)."""
+    cut = text.rfind(" ", 0, limit + 1)
+    if cut <= 0:
+        return text[:limit], text[limit:].lstrip()
+    return text[:cut], text[cut + 1:]
+
+
+def _fade_edges(audio, sample_rate, seconds=_FADE_SECONDS):
+    """Short linear fade-in/out so independently synthesized chunks join without clicks."""
+    n = min(int(seconds * sample_rate), len(audio) // 2)
+    if n > 0:
+        ramp = np.linspace(0.0, 1.0, n, dtype=np.float32)
+        audio = audio.copy()
+        audio[:n] *= ramp
+        audio[-n:] *= ramp[::-1]
+    return audio
@@ -0,0 +1,399 @@
+"""
+tts_pool.py
+───────────
+A pool of Kokoro TTS worker processes shared by many clients.
+
+Each worker owns an onnxruntime session and synthesizes one sentence at a
+time, sending audio blocks back as they are produced (see
+tts_handler.synthesize_chunks). The voice table is unpacked once into
+per-voice .npy files and memory-mapped by every worker, so the pages are
+shared instead of each process holding its own copy.
+
+    pool = TTSWorkerPool(workers=4)
+    pool.start()
+    for block in pool.submit("Hello there."):    # float32 @ pool.sample_rate
+        ...
+    pool.close()
+"""
+
+import os
+import time
+import queue
+import itertools
+import collections
+import threading
+import multiprocessing as mp
+import numpy as np
+
+from tts_handler import MODEL_PATH, VOICES_PATH, load_kokoro, synthesize_chunks
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_VOICES_CACHE = os.path.join(_HERE, "ai", "models", "voices", "mmap")
+
+# How many recent jobs the wait/latency percentiles are computed over
+_METRIC_WINDOW = 1000
+
+# How often the router checks that workers are still alive, in seconds
+_LIVENESS_INTERVAL = 0.5
+
+
+def _unpack_voices(voices_path, cache_dir):
+    """Write each voice in the .bin (npz) archive to cache_dir/<name>.npy, once."""
+    marker = os.path.join(cache_dir, ".source")
+    stamp = f"{os.path.abspath(voices_path)} {os.path.getmtime(voices_path)}"
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if f.read() == stamp:
+                return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with np.load(voices_path) as archive:
+        for name in archive.files:
+            np.save(os.path.join(cache_dir, f"{name}.npy"), archive[name])
+    with open(marker, "w") as f:
+        f.write(stamp)
+
+
+def _map_voices(cache_dir):
+    return {
+        name[:-4]: np.load(os.path.join(cache_dir, name), mmap_mode="r")
+        for name in os.listdir(cache_dir) if name.endswith(".npy")
+    }
+
+
+def _worker_main(worker_id, model_path, voices_path, voices_dir, intra_op_threads,
+                 warmup_voice, tasks, results):
+    """Worker process: load the model, then synthesize tasks until a None arrives."""
+    try:
+        kokoro = load_kokoro(model_path, voices_path, intra_op_threads=intra_op_threads)
+        kokoro.voices = _map_voices(voices_dir)
+        kokoro.create("Hello there.", voice=warmup_voice, lang="en-us")
+    except Exception as e:
+        results.put(("failed", worker_id, str(e)))
+        return
+    results.put(("ready", worker_id, None))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job_id, text, voice, speed = task
+        results.put(("start", job_id, time.time()))
+        try:
+            for audio, sample_rate in synthesize_chunks(kokoro, text, voice, speed):
+                results.put(("block", job_id, (sample_rate, audio.tobytes())))
+            results.put(("done", job_id, worker_id))
+        except Exception as e:
+            results.put(("error", job_id, (worker_id, str(e))))
+
+
+class PoolBusy(RuntimeError):
+    """Raised by TTSWorkerPool.submit() when no slot frees up within its timeout."""
+
+
+class TTSJob:
+    """Handle for one submitted sentence. Iterate it to receive float32 audio blocks."""
+
+    def __init__(self, pool, job_id, text, voice, speed, submitted):
+        self.job_id    = job_id
+        self.submitted = submitted
+        self._pool     = pool
+        self._task     = (job_id, text, voice, speed)
+        self._blocks   = queue.Queue()
+
+    def __iter__(self):
+        while True:
+            try:
+                kind, payload = self._blocks.get(timeout=self._pool.block_timeout)
+            except queue.Empty:
+                self.cancel()
+                raise RuntimeError(f"TTS job {self.job_id} produced no audio "
+                                   f"for {self._pool.block_timeout}s")
+            if kind == "done":
+                return
+            if kind == "error":
+                raise RuntimeError(f"TTS worker failed: {payload}")
+            yield payload
+
+    def cancel(self):
+        """Drop the job: skipped if still queued, its audio discarded if running."""
+        self._pool._cancel(self)
+
+
+class TTSWorkerPool:
+    def __init__(self, workers=None, intra_op_threads=1, max_pending=None,
+                 block_timeout=30.0, max_restarts=None, warmup_voice="af_heart",
+                 model_path=MODEL_PATH, voices_path=VOICES_PATH, voices_cache=_VOICES_CACHE):
+        """
+        workers          : worker processes (default: one per core)
+        intra_op_threads : onnxruntime threads per worker; 1 lets the pool,
+                           not onnxruntime, spread load across cores
+        max_pending      : jobs queued or running before submit() waits for a
+                           slot (default: 4 per worker)
+        block_timeout    : seconds a job may go without producing audio before
+                           iterating it raises
+        max_restarts     : dead workers respawned over the pool's lifetime
+                           (default: 2 per worker). Once used up, a death
+                           shrinks the pool and max_pending with it.
+        """
+        self.workers          = workers or os.cpu_count() or 1
+        self.intra_op_threads = intra_op_threads
+        self.max_pending      = max_pending or 4 * self.workers
+        self.block_timeout    = block_timeout
+        self.max_restarts     = 2 * self.workers if max_restarts is None else max_restarts
+        self.sample_rate      = 24000
+
+        self._warmup_voice = warmup_voice
+        self._model_path   = model_path
+        self._voices_path  = voices_path
+        self._voices_cache = voices_cache
+
+        # spawn: onnxruntime and the server's threads do not survive fork()
+        self._ctx       = mp.get_context("spawn")
+        self._results   = self._ctx.Queue()
+        self._processes = {}                 # worker_id → Process, while alive
+        self._tasks     = {}                 # worker_id → that worker's task queue
+        self._router    = None
+        self._closing   = False
+
+        # Jobs wait here, not in the workers' queues, so a job is only handed
+        # to a worker once it is idle — queued jobs can still be cancelled and
+        # the pool always knows which job each worker is running.
+        self._lock     = threading.Condition()
+        self._backlog  = collections.deque()
+        self._idle     = []                  # worker ids with nothing to do
+        self._loading  = set()               # respawned worker ids not ready yet
+        self._running  = {}                  # worker_id → job_id
+        self._jobs     = {}                  # job_id → TTSJob, until done/error
+        self._started  = set()               # job ids a worker has picked up
+        self._first    = set()               # job ids that delivered a block
+        self._cancelled = set()              # running job ids whose audio is dropped
+        self._next_id  = itertools.count()
+        self._counters = dict(submitted=0, rejected=0, completed=0, failed=0,
+                              cancelled=0, worker_deaths=0, worker_restarts=0)
+        self._pending_per_worker = self.max_pending / self.workers
+        self._last_check = time.monotonic()
+        self._peak_pending = 0
+        self._queue_waits  = []              # seconds from submit to worker pickup
+        self._first_blocks = []              # seconds from submit to first block
+
+    # ─────────────────────────────────────────────────────────────────────────
+    def start(self):
+        """Spawn the workers and block until every one has loaded the model."""
+        start = time.perf_counter()
+        _unpack_voices(self._voices_path, self._voices_cache)
+
+        for i in range(self.workers):
+            self._processes[i], self._tasks[i] = self._spawn(i)
+
+        waiting = set(self._processes)
+        while waiting:
+            try:
+                kind, worker_id, error = self._results.get(timeout=_LIVENESS_INTERVAL)
+            except queue.Empty:
+                dead = [i for i in waiting if not self._processes[i].is_alive()]
+                if dead:
+                    exitcode = self._processes[dead[0]].exitcode
+                    self.close()
+                    raise RuntimeError(f"TTS worker {dead[0]} exited while loading "
+                                       f"(exit code {exitcode})")
+                continue
+            if kind == "failed":
+                self.close()
+                raise RuntimeError(f"TTS worker {worker_id} failed to load: {error}")
+            waiting.discard(worker_id)
+            self._idle.append(worker_id)
+
+        self._router = threading.Thread(target=self._route_results, daemon=True, name="TTSPoolRouter")
+        self._router.start()
+        print(f"[TTSPool] {self.workers} workers ready in {time.perf_counter() - start:.2f}s")
+
+    def submit(self, text, voice="af_heart", speed=1.0, timeout=None) -> TTSJob:
+        """
+        Queue one sentence for synthesis. When max_pending jobs are already
+        queued or running, wait for a slot; raise PoolBusy if `timeout`
+        seconds pass first (timeout=0 fails at once, None waits indefinitely).
+        """
+        with self._lock:
+            if not self._lock.wait_for(lambda: len(self._jobs) < self.max_pending, timeout):
+                self._counters["rejected"] += 1
+                raise PoolBusy(f"{len(self._jobs)} TTS jobs pending (limit {self.max_pending})")
+            if not self._processes:
+                raise RuntimeError("TTS pool has no live workers")
+            job = TTSJob(self, next(self._next_id), text, voice, speed, time.time())
+            self._jobs[job.job_id] = job
+            self._backlog.append(job)
+            self._counters["submitted"] += 1
+            self._peak_pending = max(self._peak_pending, len(self._jobs))
+            self._dispatch()
+        return job
+
+    def close(self):
+        with self._lock:
+            self._closing = True
+        for tasks in self._tasks.values():
+            tasks.put(None)
+        for p in self._processes.values():
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self._processes = {}
+        self._results.put(("closed", None, None))   # stops the router thread
+        if self._router is not None:
+            self._router.join(timeout=5)
+
+    # ─────────────────────────────────────────────────────────────────────────
+    def _spawn(self, worker_id):
+        """Start one worker process; returns (process, its task queue)."""
+        tasks = self._ctx.Queue()
+        p = self._ctx.Process(
+            target=_worker_main, name=f"TTSWorker-{worker_id}", daemon=True,
+            args=(worker_id, self._model_path, self._voices_path, self._voices_cache,
+                  self.intra_op_threads, self._warmup_voice, tasks, self._results),
+        )
+        p.start()
+        return p, tasks
+
+    def _dispatch(self):
+        """Hand backlog jobs to idle workers. Caller holds self._lock."""
+        while self._idle and self._backlog:
+            job = self._backlog.popleft()
+            worker_id = self._idle.pop()
+            self._running[worker_id] = job.job_id
+            self._tasks[worker_id].put(job._task)
+
+    def _finish(self, job, kind, payload, counter):
+        """Retire a job and wake anyone waiting for a slot. Caller holds self._lock."""
+        self._jobs.pop(job.job_id, None)
+        self._started.discard(job.job_id)
+        self._first.discard(job.job_id)
+        self._cancelled.discard(job.job_id)
+        self._counters[counter] += 1
+        job._blocks.put((kind, payload))
+        self._lock.notify_all()
+
+    def _cancel(self, job):
+        with self._lock:
+            if job.job_id not in self._jobs:
+                return
+            if job in self._backlog:
+                self._backlog.remove(job)
+                self._finish(job, "error", "cancelled", "cancelled")
+            else:
+                self._cancelled.add(job.job_id)
+
+    def _check_workers(self):
+        """
+        Fail the job of any worker that died and respawn it while restarts
+        remain; after that, shrink max_pending to the workers left. With no
+        workers left at all, everything still queued fails.
+        """
+        with self._lock:
+            for worker_id, p in list(self._processes.items()):
+                if p.is_alive():
+                    continue
+                del self._processes[worker_id]
+                self._counters["worker_deaths"] += 1
+                print(f"[TTSPool] Worker {worker_id} died (exit code {p.exitcode})")
+                if worker_id in self._idle:
+                    self._idle.remove(worker_id)
+                self._loading.discard(worker_id)
+                job = self._jobs.get(self._running.pop(worker_id, None))
+                if job is not None:
+                    self._finish(job, "error", f"worker {worker_id} died", "failed")
+
+                if self._counters["worker_restarts"] < self.max_restarts:
+                    self._counters["worker_restarts"] += 1
+                    self._processes[worker_id], self._tasks[worker_id] = self._spawn(worker_id)
+                    self._loading.add(worker_id)
+                    print(f"[TTSPool] Respawning worker {worker_id}")
+                else:
+                    self.max_pending = max(1, round(self._pending_per_worker * len(self._processes)))
+            if not self._processes:
+                while self._backlog:
+                    self._finish(self._backlog.popleft(), "error", "no live TTS workers", "failed")
+
+    def _route_results(self):
+        """Hand blocks from the shared result queue to the job they belong to."""
+        while True:
+            # On a timer, not only when the queue goes quiet: under load the
+            # other workers' blocks never let get() time out
+            if not self._closing and time.monotonic() - self._last_check >= _LIVENESS_INTERVAL:
+                self._last_check = time.monotonic()
+                self._check_workers()
+            try:
+                kind, job_id, payload = self._results.get(timeout=_LIVENESS_INTERVAL)
+            except queue.Empty:
+                continue
+            if kind == "closed":
+                break
+            now = time.time()
+
+            with self._lock:
+                # ready/failed come from respawned workers; their second field is the worker id
+                if kind == "ready":
+                    if job_id in self._loading:
+                        self._loading.discard(job_id)
+                        self._idle.append(job_id)
+                        self._dispatch()
+                    continue
+                if kind == "failed":
+                    print(f"[TTSPool] Worker {job_id} failed to load: {payload}")
+                    continue
+
+                if kind in ("done", "error"):
+                    worker_id = payload if kind == "done" else payload[0]
+                    self._running.pop(worker_id, None)
+                    if (worker_id in self._processes and worker_id not in self._loading
+                            and worker_id not in self._idle):
+                        self._idle.append(worker_id)
+                    self._dispatch()
+
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                if kind == "start":
+                    self._started.add(job_id)
+                    _record(self._queue_waits, payload - job.submitted)
+                elif kind == "done":
+                    counter = "cancelled" if job_id in self._cancelled else "completed"
+                    self._finish(job, "done", None, counter)
+                elif kind == "error":
+                    self._finish(job, "error", payload[1], "failed")
+                elif job_id not in self._cancelled:
+                    if job_id not in self._first:
+                        self._first.add(job_id)
+                        _record(self._first_blocks, now - job.submitted)
+                    sample_rate, pcm = payload
+                    self.sample_rate = sample_rate
+                    job._blocks.put(("block", np.frombuffer(pcm, dtype=np.float32)))
+
+    def metrics(self) -> dict:
+        """Snapshot of load and latency. Times are in seconds."""
+        with self._lock:
+            running = len(self._started)
+            return {
+                "workers":          self.workers,
+                "live_workers":     len(self._processes) - len(self._loading),
+                "loading_workers":  len(self._loading),
+                "restarts_left":    self.max_restarts - self._counters["worker_restarts"],
+                "max_pending":      self.max_pending,
+                "queued":           len(self._jobs) - running,
+                "running":          running,
+                "peak_pending":     self._peak_pending,
+                **self._counters,
+                "queue_wait_p50":   _percentile(self._queue_waits, 50),
+                "queue_wait_p95":   _percentile(self._queue_waits, 95),
+                "first_block_p50":  _percentile(self._first_blocks, 50),
+                "first_block_p95":  _percentile(self._first_blocks, 95),
+            }
+
+
+def _record(samples, value):
+    samples.append(value)
+    if len(samples) > _METRIC_WINDOW:
+        del samples[0]
+
+
+def _percentile(samples, q):
+    return round(float(np.percentile(samples, q)), 4) if samples else None